@@ -1,8 +1,22 @@
 import os
 import json
+import asyncio
+import functools
+import hashlib
 import logging
-from typing import Dict, Any, Optional, List, Union
-from openai import OpenAI
+import queue
+import re
+import sqlite3
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, AsyncIterator, Literal, Optional, List, Tuple, Union
+import httpx
+import numpy as np
+from pydantic import BaseModel, ConfigDict
+from openai import (
+    AsyncOpenAI, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+)
+from tenacity import retry, stop_after_attempt, wait_random_exponential, retry_if_exception_type
 from hawkinsdb import HawkinsDB
 
 os.environ["OPENAI_API_KEY"]=""
@@ -10,67 +24,919 @@ os.environ["OPENAI_API_KEY"]=""
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class TextToHawkinsDB:
-    def __init__(self, api_key: Optional[str] = None):
-        """Initialize with OpenAI API key."""
-        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
-        if not self.api_key:
-            raise ValueError("OpenAI API key is required")
-        self.client = OpenAI(api_key=self.api_key)
-        self.db = HawkinsDB(storage_type='sqlite')
+try:
+    import tiktoken
+except ImportError:
+    logger.warning("tiktoken not available, prompt sizes will be estimated")
+    tiktoken = None
+
+# HTTP/2 lets concurrent requests share connections; httpx needs h2 for it
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    logger.warning("h2 not available, OpenAI requests will use HTTP/1.1")
+    HTTP2_AVAILABLE = False
+
+# Compact JSON helpers for prompts, responses, cache rows and logs; orjson
+# is optional and both of its decode errors subclass ValueError
+try:
+    import orjson
+
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj: Any) -> str:
+        return json.dumps(obj, separators=(",", ":"))
+
+    _loads = json.loads
+
+class _LazyJSON:
+    """Log argument that is serialized only if the record is emitted.
+
+    Use with %-style logging (``logger.info("Result: %s", _LazyJSON(obj))``);
+    filtered records never call ``__str__``.
+    """
+
+    __slots__ = ("obj",)
+
+    def __init__(self, obj: Any):
+        self.obj = obj
 
-    def text_to_json(self, text: str) -> Dict[str, Any]:
-        """Convert text description to HawkinsDB-compatible JSON using GPT-4."""
-        prompt = """Convert the following text into a structured JSON format suitable for a memory database. 
+    def __str__(self) -> str:
+        return json.dumps(self.obj, separators=(",", ":"), default=str)
+
+# Bump whenever PROMPT or the converted JSON format changes so cached
+# conversions from older versions are ignored
+PROMPT_VERSION = "3"
+
+# System prompt shared by the per-text and Batch API extraction paths
+PROMPT = """Convert the following text into a structured JSON format suitable for a memory database. 
         
         Rules:
         1. Extract key entity details, properties, and relationships
         2. Use underscores for entity names (e.g., Python_Language)
         3. Categorize memory as one of: Semantic, Episodic, or Procedural
         4. Include relevant properties and relationships
+        5. Episodic memories need a "timestamp" property and Procedural memories a "steps" property
         
         Required JSON format:
         {
             "column": "memory_type",
             "name": "entity_name",
-            "properties": {
-                "key1": "value1",
-                "key2": ["value2a", "value2b"]
-            },
-            "relationships": {
-                "related_to": ["entity1", "entity2"],
-                "part_of": ["parent_entity"]
-            }
+            "properties": [
+                {"key": "key1", "values": ["value1"]},
+                {"key": "key2", "values": ["value2a", "value2b"]}
+            ],
+            "relationships": [
+                {"type": "related_to", "targets": ["entity1", "entity2"]},
+                {"type": "part_of", "targets": ["parent_entity"]}
+            ]
         }
 
         Text to convert:
         """
 
+# System message reused by every extraction request. Kept as a plain dict
+# because it is serialized as-is into request bodies; never mutate it.
+_SYSTEM_MSG = {"role": "system", "content": PROMPT}
+
+class EntityProperty(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    key: str
+    values: List[str]
+
+class EntityRelationship(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    type: str
+    targets: List[str]
+
+# Schema the extraction model is constrained to answer with. Structured
+# outputs do not allow free-form object keys, so properties and relationships
+# are lists of pairs; to_dict turns them into the mapping HawkinsDB expects.
+# The docstring is sent to the model as the schema description.
+class Entity(BaseModel):
+    """A memory entity extracted from text."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    column: Literal["Semantic", "Episodic", "Procedural"]
+    name: str
+    properties: List[EntityProperty]
+    relationships: List[EntityRelationship]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to the entity dict accepted by ``HawkinsDB.add_entity``.
+
+        Values are always lists of strings, like the offline extractor's;
+        repeated keys and relationship types are merged.
+        """
+        return {
+            "column": self.column,
+            "name": self.name,
+            "properties": self._merge((prop.key, prop.values) for prop in self.properties),
+            "relationships": self._merge((rel.type, rel.targets) for rel in self.relationships)
+        }
+
+    @staticmethod
+    def _merge(pairs) -> Dict[str, List[str]]:
+        """Group values by key, keeping first-seen order and dropping repeats."""
+        merged: Dict[str, List[str]] = {}
+        for key, values in pairs:
+            bucket = merged.setdefault(key, [])
+            for value in values:
+                if value not in bucket:
+                    bucket.append(value)
+        return merged
+
+# response_format for Batch API requests, which take raw request bodies
+# instead of the Entity class accepted by the SDK's parse()
+_ENTITY_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "Entity", "strict": True, "schema": Entity.model_json_schema()}
+}
+
+# Model used to convert text descriptions to HawkinsDB JSON; it must support
+# structured outputs
+EXTRACTION_MODEL = "gpt-4o-mini"
+
+# Semantic cache for query_by_text: questions whose embedding has a cosine
+# similarity above the threshold with a previous question reuse its answer
+EMBEDDING_MODEL = "text-embedding-3-small"
+SEMANTIC_CACHE_THRESHOLD = 0.92
+
+# Upper bound on the serialized context sent with each question, in bytes
+CONTEXT_BUDGET = 8192
+
+# Model used to answer questions, its context window and the answer length;
+# prompts are trimmed locally so they always fit
+QA_MODEL = "gpt-4o"
+QA_MODEL_MAX_TOKENS = 128000
+QA_ANSWER_MAX_TOKENS = 500
+
+@functools.lru_cache(maxsize=1)
+def _qa_encoding():
+    """Load the tokenizer for QA_MODEL once; None if it is unavailable."""
+    if tiktoken is None:
+        return None
+    try:
+        # May download the encoding on first use
+        return tiktoken.encoding_for_model(QA_MODEL)
+    except Exception as e:
+        logger.warning(f"Could not load tokenizer for {QA_MODEL}, prompt sizes will be estimated: {str(e)}")
+        return None
+
+def _count_tokens(text: str) -> int:
+    """Count prompt tokens for QA_MODEL, or estimate them without a tokenizer."""
+    encoding = _qa_encoding()
+    if encoding is None:
+        return len(text.encode("utf-8")) // 3
+    return len(encoding.encode(text))
+
+def _frame_context(name: str, frames: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact view of an entity's frames for the question-answering prompt.
+
+    Keeps property values and relationship targets only; confidences,
+    sources and timestamps would make up most of the serialized context.
+    """
+    def values(candidates):
+        if not isinstance(candidates, list):
+            candidates = [candidates]
+        flat = [getattr(candidate, "value", candidate) for candidate in candidates]
+        return flat[0] if len(flat) == 1 else flat
+
+    entity: Dict[str, Any] = {"name": next(iter(frames.values())).name or name}
+    for column, frame in frames.items():
+        view = {}
+        if frame.properties:
+            view["properties"] = {key: values(c) for key, c in frame.properties.items()}
+        if frame.relationships:
+            view["relationships"] = {key: values(c) for key, c in frame.relationships.items()}
+        entity[column] = view
+    return entity
+
+def _build_qa_prompt(context: List[str], query_text: str) -> str:
+    """Build the question-answering prompt from serialized context."""
+    return f"""You are a helpful assistant with access to a knowledge base.
+        Answer the following question based on this context:
+
+        Context:
+        {' '.join(context)}
+
+        Question: {query_text}
+
+        Rules:
+        1. Only use information from the provided context
+        2. If information is not in the context, say so
+        3. Be specific and include details when available
+        4. Format numbers and dates clearly
+        """
+
+# Rate limits and transient connection/server errors are retried with
+# jittered exponential backoff; anything else fails immediately
+_openai_retry = retry(
+    stop=stop_after_attempt(5),
+    wait=wait_random_exponential(min=1, max=20),
+    retry=retry_if_exception_type(
+        (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+    ),
+    reraise=True
+)
+
+# Statuses after which a Batch API job will not progress any further
+BATCH_TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+# Patterns for the offline extraction path; see _fast_extract
+_SUBJECT_RE = re.compile(r"^\s*(?:The |A |An )?(?P<name>[A-Z][\w+#.-]*(?: [A-Z0-9][\w+#.-]*)*) is (?P<rest>[^.]*)")
+_TYPE_RE = re.compile(
+    r"an? (?P<type>[a-z][a-z -]*?)(?= (?:created|made|developed|written|built|located|parked|"
+    r"stored|kept|used|that|which|in|with)\b|,|$)"
+)
+_COLOR_RE = re.compile(r"\b(red|orange|yellow|green|blue|purple|black|white|gray|grey|silver|gold|brown|pink)\b")
+_YEAR_RE = re.compile(r"\b(?:in|since|from) ((?:1[89]|20)\d\d)\b")
+_CREATOR_RE = re.compile(
+    r"\b(?:created|developed|invented|designed|founded) by "
+    r"(?P<creator>[A-Z][\w.]*(?: (?:van |von |de )?[A-Z][\w.]*)*)"
+)
+_QUANTITY_RE = re.compile(
+    r"\b(?P<key>[a-z]+) of (?P<value>\d+(?:\.\d+)? ?"
+    r"(?:miles|km|kilometers|hours|minutes|seconds|mph|kg|lbs|pounds|years|%))"
+)
+_ACCELERATION_RE = re.compile(r"\b(?P<metric>\d+-\d+ ?(?:mph|km/h)) in (?P<value>\d+(?:\.\d+)? ?seconds)\b")
+_LOCATION_RE = re.compile(r"\b(?:parked|located|stored|kept) in (?:the |a |an )?(?P<location>[a-z][\w ]*?)(?=[.,]| and|$)")
+# A use is up to three words that do not start another clause
+_USE = r"(?!(?:but|yet|so|while|though|although|because|which|that|when|it|is|was)\b)[a-z]+"
+_USED_FOR_RE = re.compile(
+    rf"\bused for (?P<uses>{_USE}(?: {_USE}){{0,2}}(?:,? (?:and |or )?{_USE}(?: {_USE}){{0,2}})*)"
+)
+_NEGATION_RE = re.compile(r"\b(?:not|no|never|neither|nor|without)\b|n't\b", re.IGNORECASE)
+
+# Words that may remain once every pattern has matched; any other leftover
+# word is a clause the offline path would silently drop
+_FILLER_WORDS = frozenset({
+    "a", "an", "the", "and", "it", "it's", "its", "is", "was", "has", "have",
+    "goes", "made", "built", "released"
+})
+_PRONOUN_SUBJECTS = frozenset({"it", "this", "that", "he", "she", "they", "i", "we", "you"})
+
+# Minimum number of extracted fields before the offline result is trusted
+MIN_FAST_FIELDS = 3
+
+def _fast_extract(text: str) -> Optional[Dict[str, Any]]:
+    """Extract simple descriptive texts without calling the LLM.
+
+    Handles sentences of the form "The <Name> is ..." with years, colors,
+    creators, quantities and locations, stored as Semantic memories with
+    string-list values like the LLM path. Returns None, so the caller falls
+    back to the LLM, when the text does not match, contains a negation,
+    leaves any clause unmatched, or too few fields were found.
+    """
+    text = " ".join(text.split())
+    subject = _SUBJECT_RE.match(text)
+    if (
+        not subject
+        or subject.group("name").lower() in _PRONOUN_SUBJECTS
+        or _NEGATION_RE.search(text)
+    ):
+        return None
+
+    properties: Dict[str, List[str]] = {}
+    relationships: Dict[str, List[str]] = {}
+    # Character spans consumed by a pattern, used to detect unmatched clauses
+    spans = [(subject.start(), subject.start("rest"))]
+    rest_start, rest_end = subject.span("rest")
+
+    entity_type = _TYPE_RE.match(text, rest_start, rest_end)
+    if entity_type:
+        properties["type"] = [entity_type.group("type").strip()]
+        spans.append(entity_type.span())
+
+    color = _COLOR_RE.search(text, rest_start, rest_end)
+    if color:
+        properties["color"] = [color.group(1)]
+        spans.append(color.span())
+
+    year = _YEAR_RE.search(text)
+    if year:
+        properties["year"] = [year.group(1)]
+        spans.append(year.span())
+
+    # A repeated key would keep only its last value
+    for match in _QUANTITY_RE.finditer(text):
+        if match.group("key") in properties:
+            return None
+        properties[match.group("key")] = [match.group("value")]
+        spans.append(match.span())
+
+    for match in _ACCELERATION_RE.finditer(text):
+        metric = re.sub(r"\W+", "_", match.group("metric"))
+        if metric in properties:
+            return None
+        properties[metric] = [match.group("value")]
+        spans.append(match.span())
+
+    creator = _CREATOR_RE.search(text)
+    if creator:
+        relationships["created_by"] = [creator.group("creator")]
+        spans.append(creator.span())
+
+    location = _LOCATION_RE.search(text)
+    if location:
+        relationships["located_in"] = [location.group("location").strip()]
+        spans.append(location.span())
+
+    used_for = _USED_FOR_RE.search(text)
+    if used_for:
+        uses = re.split(r",\s*(?:and\s+|or\s+)?|\s+(?:and|or)\s+", used_for.group("uses"))
+        relationships["used_for"] = [use.strip() for use in uses if use.strip()]
+        spans.append(used_for.span())
+
+    if len(properties) + len(relationships) < MIN_FAST_FIELDS:
+        return None
+
+    # Overlapping matches mean one pattern ran into another's clause
+    leftover, position = [], 0
+    for start, end in sorted(spans):
+        if start < position:
+            return None
+        leftover.append(text[position:start])
+        position = max(position, end)
+    leftover.append(text[position:])
+    words = re.findall(r"[\w'-]+", " ".join(leftover).lower())
+    if any(word not in _FILLER_WORDS for word in words):
+        return None
+
+    return {
+        "column": "Semantic",
+        "name": re.sub(r"\s+", "_", subject.group("name")),
+        "properties": properties,
+        "relationships": relationships
+    }
+
+class StorageWorker(threading.Thread):
+    """Background writer that commits queued entities to HawkinsDB in batches.
+
+    Each drain collects up to ``max_batch`` pending entities and writes them
+    with a single ``HawkinsDB.add_entities`` call, so a burst of inserts
+    costs one SQLite transaction instead of one per entity.
+    """
+
+    _STOP = object()
+
+    def __init__(self, db: HawkinsDB, max_batch: int = 256):
+        super().__init__(name="hawkinsdb-storage-worker", daemon=True)
+        self.db = db
+        self.max_batch = max_batch
+        self.write_queue: queue.SimpleQueue = queue.SimpleQueue()
+
+    def submit(self, json_data: Dict[str, Any]) -> Future:
+        """Queue an entity for writing; the future resolves to its add result."""
+        future: Future = Future()
+        self.write_queue.put((json_data, future))
+        return future
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Block until every entity submitted so far has been written."""
+        marker: Future = Future()
+        self.write_queue.put((None, marker))
+        marker.result(timeout)
+
+    def stop(self) -> None:
+        """Write any pending entities and stop the worker."""
+        self.write_queue.put(self._STOP)
+        self.join()
+
+    @staticmethod
+    def _claim(future: Future) -> bool:
+        """Mark a queued future as running; False if it was cancelled meanwhile.
+
+        Callers awaiting through ``asyncio.wrap_future`` cancel the future when
+        they time out, and a claimed future can no longer be cancelled, so the
+        worker is the only one to resolve it.
+        """
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": text}
-                ],
-                temperature=0.3,
-                response_format={"type": "json_object"}
+            return future.set_running_or_notify_cancel()
+        except RuntimeError:
+            # Already running or resolved by someone else
+            return False
+
+    def run(self):
+        while True:
+            batch = [self.write_queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.write_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stopping = any(item is self._STOP for item in batch)
+            items = [
+                item for item in batch
+                if item is not self._STOP and self._claim(item[1])
+            ]
+            writes = [(data, future) for data, future in items if data is not None]
+
+            if writes:
+                try:
+                    results = self.db.add_entities([data for data, _ in writes])
+                except Exception as e:
+                    logger.error(f"Error writing batch to database: {str(e)}")
+                    for _, future in writes:
+                        future.set_exception(e)
+                else:
+                    for (_, future), result in zip(writes, results):
+                        future.set_result(result)
+
+            # Flush markers resolve only after the writes queued before them
+            for data, future in items:
+                if data is None:
+                    future.set_result(None)
+
+            if stopping:
+                return
+
+class TextToHawkinsDB:
+    def __init__(self, api_key: Optional[str] = None, max_concurrent_requests: int = 32):
+        """Initialize with OpenAI API key."""
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        if not self.api_key:
+            raise ValueError("OpenAI API key is required")
+        # One pooled HTTP client shared by every OpenAI request
+        self._http = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+            timeout=30.0
+        )
+        # Retries are handled by _request; the SDK's own retries would multiply them
+        self.aclient = AsyncOpenAI(api_key=self.api_key, http_client=self._http, max_retries=0)
+        # Fixed request parameters are bound once; call sites only add messages
+        self._extract_call = functools.partial(
+            self.aclient.beta.chat.completions.parse,
+            model=EXTRACTION_MODEL,
+            temperature=0.3,
+            response_format=Entity
+        )
+        self._qa_call = functools.partial(
+            self.aclient.chat.completions.create,
+            model=QA_MODEL,
+            temperature=0.3,
+            max_tokens=QA_ANSWER_MAX_TOKENS
+        )
+        # WAL with synchronous=NORMAL is the storage default; keep temp tables
+        # in memory and memory-map the database for faster reads
+        self.db = HawkinsDB(
+            storage_type='sqlite',
+            pragmas={"temp_store": "MEMORY", "mmap_size": 268435456}
+        )
+        self.storage_worker = StorageWorker(self.db)
+        self.storage_worker.start()
+        self._init_cache()
+        # Caps the number of in-flight OpenAI requests during batch ingestion
+        self._sem = asyncio.Semaphore(max_concurrent_requests)
+
+    async def __aenter__(self) -> "TextToHawkinsDB":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close HTTP connections and finish pending database writes."""
+        await self._http.aclose()
+        await asyncio.to_thread(self.storage_worker.stop)
+        await self._cache_io(self._cache_conn.close)
+        self._cache_executor.shutdown()
+
+    @_openai_retry
+    async def _request(self, endpoint, /, **kwargs):
+        """Call an OpenAI endpoint, retrying rate limits and transient errors."""
+        # endpoint is positional-only: batches.create takes an endpoint keyword
+        return await endpoint(**kwargs)
+
+    def _init_cache(self):
+        """Create the conversion and answer cache tables in the HawkinsDB SQLite file.
+
+        The cache connection shares the database write lock with the storage
+        worker, so it lives on a dedicated thread and every cache query runs
+        there instead of blocking the event loop.
+        """
+        self._cache_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hawkinsdb-cache")
+
+        def open_cache():
+            self._cache_conn = self.db.storage.get_connection()
+            self._cache_conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, json_blob TEXT NOT NULL)"
+            )
+            self._cache_conn.execute(
+                "CREATE TABLE IF NOT EXISTS qa_cache ("
+                "query TEXT PRIMARY KEY, embedding BLOB NOT NULL, response TEXT NOT NULL)"
+            )
+            self._cache_conn.commit()
+            return self._cache_conn.execute(
+                "SELECT query, embedding, response FROM qa_cache"
+            ).fetchall()
+
+        rows = self._cache_executor.submit(open_cache).result()
+        self._reset_qa_memory()
+        # Bumped by every database write; answers built from an older
+        # generation's context are not cached
+        self._qa_generation = 0
+        if rows:
+            self._remember_answers(
+                [row[0] for row in rows],
+                np.vstack([np.frombuffer(row[1], dtype=np.float32) for row in rows]),
+                [row[2] for row in rows]
+            )
+
+    async def _cache_io(self, fn, *args):
+        """Run a cache query on the thread that owns the cache connection."""
+        return await asyncio.get_running_loop().run_in_executor(self._cache_executor, fn, *args)
+
+    @staticmethod
+    def _cache_key(text: str) -> str:
+        """Cache key for a text under the current prompt version."""
+        return hashlib.sha256((PROMPT_VERSION + text).encode("utf-8")).hexdigest()
+
+    async def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached conversion for key, if any."""
+        def read():
+            try:
+                row = self._cache_conn.execute(
+                    "SELECT json_blob FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                return _loads(row[0]) if row else None
+            except (sqlite3.Error, ValueError) as e:
+                logger.warning(f"Error reading conversion cache: {str(e)}")
+                return None
+
+        return await self._cache_io(read)
+
+    async def _cache_put(self, key: str, json_data: Dict[str, Any]) -> None:
+        """Store a conversion in the cache."""
+        def write():
+            try:
+                self._cache_conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, json_blob) VALUES (?, ?)",
+                    (key, _dumps(json_data))
+                )
+                self._cache_conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Error writing conversion cache: {str(e)}")
+
+        await self._cache_io(write)
+
+    def _reset_qa_memory(self) -> None:
+        """Empty the in-memory copy of the answer cache."""
+        self._qa_rows: Dict[str, int] = {}
+        self._qa_answers: List[str] = []
+        # Question embeddings as float32 rows; rows past len(_qa_answers) are spare capacity
+        self._qa_vectors: Optional[np.ndarray] = None
+
+    def _remember_answers(self, queries: List[str], vectors: np.ndarray, answers: List[str]) -> None:
+        """Add question embeddings and answers to the in-memory matrix.
+
+        A repeated question overwrites its row, like INSERT OR REPLACE in
+        SQLite. New rows go into spare capacity that grows geometrically, so
+        appending an answer does not copy the whole matrix.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        for query_text, vector, answer in zip(queries, vectors, answers):
+            row = self._qa_rows.get(query_text)
+            if row is None:
+                row = len(self._qa_answers)
+                if self._qa_vectors is None or row == len(self._qa_vectors):
+                    grown = np.empty((max(16, 2 * row), vectors.shape[1]), dtype=np.float32)
+                    if self._qa_vectors is not None:
+                        grown[:row] = self._qa_vectors
+                    self._qa_vectors = grown
+                self._qa_rows[query_text] = row
+                self._qa_answers.append(answer)
+            else:
+                self._qa_answers[row] = answer
+            self._qa_vectors[row] = vector
+
+    async def _embed(self, text: str) -> np.ndarray:
+        """Embed text as a unit-length float32 vector."""
+        async with self._sem:
+            response = await self._request(
+                self.aclient.embeddings.create, model=EMBEDDING_MODEL, input=text
             )
+        vector = np.asarray(response.data[0].embedding, dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+
+    async def _aembed_many(self, texts: List[str], chunk: int = 1000) -> np.ndarray:
+        """Embed many texts as unit-length float32 rows.
+
+        The input is split into ``chunk``-sized requests which are sent
+        concurrently; rows are returned in input order.
+        """
+        async def embed_chunk(batch: List[str]):
+            async with self._sem:
+                return await self._request(
+                    self.aclient.embeddings.create, model=EMBEDDING_MODEL, input=batch
+                )
+
+        responses = await asyncio.gather(
+            *[embed_chunk(texts[i:i + chunk]) for i in range(0, len(texts), chunk)]
+        )
+        matrix = np.vstack(
+            [[item.embedding for item in response.data] for response in responses]
+        ).astype(np.float32)
+        return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+    def _qa_cache_get(self, vector: np.ndarray) -> Optional[str]:
+        """Return the answer of the most similar cached question, if close enough."""
+        if not self._qa_answers:
+            return None
+        sims = self._qa_vectors[:len(self._qa_answers)] @ vector
+        best = int(np.argmax(sims))
+        return self._qa_answers[best] if sims[best] > SEMANTIC_CACHE_THRESHOLD else None
+
+    async def _qa_cache_put(
+        self, query_text: str, vector: np.ndarray, answer: str, generation: int
+    ) -> None:
+        """Store a question embedding and its answer.
+
+        ``generation`` is the value of ``_qa_generation`` when the answer's
+        context was read; the answer is dropped if the database changed since.
+        """
+        if generation != self._qa_generation:
+            return
+        await self._qa_cache_put_many([query_text], vector[np.newaxis, :], [answer])
+
+    async def _qa_cache_put_many(self, queries: List[str], vectors: np.ndarray, answers: List[str]) -> None:
+        """Store several question embeddings and their answers in one transaction."""
+        # Memory is updated before the write is queued, so a later
+        # _clear_qa_cache cannot be undone by this call
+        self._remember_answers(queries, vectors, answers)
+
+        def write():
+            try:
+                self._cache_conn.executemany(
+                    "INSERT OR REPLACE INTO qa_cache (query, embedding, response) VALUES (?, ?, ?)",
+                    [
+                        (query_text, vector.astype(np.float32).tobytes(), answer)
+                        for query_text, vector, answer in zip(queries, vectors, answers)
+                    ]
+                )
+                self._cache_conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Error writing answer cache: {str(e)}")
 
-            json_str = response.choices[0].message.content
-            return json.loads(json_str)
+        await self._cache_io(write)
+
+    async def warm_qa_cache(self, qa_pairs: List[Tuple[str, str]]) -> Dict[str, Any]:
+        """Populate the answer cache from known (question, answer) pairs."""
+        if not qa_pairs:
+            return {"success": True, "message": "Nothing to cache", "cached": 0}
+        try:
+            queries = [query_text for query_text, _ in qa_pairs]
+            vectors = await self._aembed_many(queries)
+            await self._qa_cache_put_many(queries, vectors, [answer for _, answer in qa_pairs])
+            return {
+                "success": True,
+                "message": "Answer cache warmed successfully",
+                "cached": len(qa_pairs)
+            }
+        except Exception as e:
+            logger.error(f"Error warming answer cache: {str(e)}")
+            return {
+                "success": False,
+                "message": str(e),
+                "cached": 0
+            }
+
+    async def _clear_qa_cache(self) -> None:
+        """Drop cached answers; they are stale once the database changes."""
+        self._qa_generation += 1
+        if not self._qa_answers:
+            return
+        # Stop serving stale answers right away, before the DELETE runs
+        self._reset_qa_memory()
+
+        def clear():
+            try:
+                self._cache_conn.execute("DELETE FROM qa_cache")
+                self._cache_conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Error clearing answer cache: {str(e)}")
+
+        await self._cache_io(clear)
+
+    async def text_to_json(self, text: str) -> Dict[str, Any]:
+        """Convert text description to HawkinsDB-compatible JSON.
+
+        Simple descriptive texts are handled by the offline extractor; the
+        rest go to the LLM.
+        """
+        result = _fast_extract(text)
+        return result if result else await self._llm_extract(text)
+
+    async def _llm_extract(self, text: str) -> Dict[str, Any]:
+        """Convert text description to HawkinsDB-compatible JSON using GPT-4.
+
+        Conversions are memoized in the ``llm_cache`` table, so known inputs
+        are answered from SQLite without calling OpenAI.
+        """
+        key = self._cache_key(text)
+        cached = await self._cache_get(key)
+        if cached is not None:
+            return cached
+
+        try:
+            async with self._sem:
+                response = await self._request(
+                    self._extract_call,
+                    messages=[_SYSTEM_MSG, {"role": "user", "content": text}]
+                )
+
+            # The SDK validates the answer against Entity; a refusal leaves
+            # parsed empty
+            message = response.choices[0].message
+            if message.parsed is None:
+                raise ValueError(f"Model refused to convert text: {message.refusal}")
+            json_data = message.parsed.to_dict()
+            await self._cache_put(key, json_data)
+            return json_data
 
         except Exception as e:
             logger.error(f"Error converting text to JSON: {str(e)}")
             raise
 
-    def add_to_db(self, text: str) -> Dict[str, Any]:
+    async def text_to_json_batch(
+        self, texts: List[str], poll_interval: float = 30.0
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        """Convert texts to JSON through the OpenAI Batch API.
+
+        Trades latency (up to the 24h completion window) for half the token
+        cost of synchronous requests. Texts handled by the offline extractor
+        or found in the conversion cache are resolved locally; only the rest
+        are submitted, once per distinct text, and their results are cached.
+        Results are returned in the same order as ``texts``; conversions that
+        failed are returned as exceptions in their slot, mirroring
+        ``asyncio.gather(return_exceptions=True)``.
+        """
+        results: List[Union[Dict[str, Any], Exception, None]] = [_fast_extract(text) for text in texts]
+        keys = [self._cache_key(text) for text in texts]
+        lookups = [i for i, result in enumerate(results) if result is None]
+        cached = await asyncio.gather(*[self._cache_get(keys[i]) for i in lookups])
+
+        # Cache key -> indices of the texts still needing a conversion
+        misses: Dict[str, List[int]] = {}
+        for i, json_data in zip(lookups, cached):
+            if json_data is not None:
+                results[i] = json_data
+            else:
+                misses.setdefault(keys[i], []).append(i)
+        if not misses:
+            return results
+
+        requests = []
+        for indices in misses.values():
+            requests.append(json.dumps({
+                "custom_id": f"req-{indices[0]}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                # Same parameters as the synchronous extraction call, with
+                # Entity sent as its JSON schema
+                "body": {
+                    **self._extract_call.keywords,
+                    "response_format": _ENTITY_RESPONSE_FORMAT,
+                    "messages": [_SYSTEM_MSG, {"role": "user", "content": texts[indices[0]]}]
+                }
+            }))
+
+        try:
+            input_file = await self._request(
+                self.aclient.files.create,
+                file=("batch_input.jsonl", "\n".join(requests).encode("utf-8")),
+                purpose="batch"
+            )
+            batch = await self._request(
+                self.aclient.batches.create,
+                input_file_id=input_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+            logger.info(f"Submitted batch {batch.id} with {len(requests)} requests")
+
+            while batch.status not in BATCH_TERMINAL_STATUSES:
+                await asyncio.sleep(poll_interval)
+                batch = await self._request(self.aclient.batches.retrieve, batch_id=batch.id)
+
+            if batch.status != "completed":
+                raise RuntimeError(f"Batch {batch.id} ended with status: {batch.status}")
+
+            for indices in misses.values():
+                error = ValueError(f"No batch output for request req-{indices[0]}")
+                for i in indices:
+                    results[i] = error
+
+            # Successful requests are in the output file, failed ones in the error file
+            converted = {}
+            for file_id in (batch.output_file_id, batch.error_file_id):
+                if not file_id:
+                    continue
+                output = await self._request(self.aclient.files.content, file_id=file_id)
+                for line in output.text.splitlines():
+                    if not line.strip():
+                        continue
+                    record = _loads(line)
+                    index = int(record["custom_id"].split("-", 1)[1])
+                    response = record.get("response") or {}
+                    if record.get("error") or response.get("status_code") != 200:
+                        result = ValueError(
+                            f"Batch request {record['custom_id']} failed: "
+                            f"{record.get('error') or response.get('body')}"
+                        )
+                    else:
+                        try:
+                            json_str = response["body"]["choices"][0]["message"]["content"]
+                            result = Entity.model_validate_json(json_str).to_dict()
+                            converted[keys[index]] = result
+                        except (KeyError, IndexError, ValueError) as e:
+                            result = ValueError(
+                                f"Invalid batch response for {record['custom_id']}: {str(e)}"
+                            )
+                    for i in misses[keys[index]]:
+                        results[i] = result
+
+            await asyncio.gather(*[self._cache_put(key, json_data) for key, json_data in converted.items()])
+            return results
+
+        except Exception as e:
+            logger.error(f"Error converting texts to JSON in batch: {str(e)}")
+            for indices in misses.values():
+                for i in indices:
+                    results[i] = e
+            return results
+
+    async def add_to_db(self, text: str) -> Dict[str, Any]:
         """Convert text to JSON and add to HawkinsDB."""
         try:
-            json_data = self.text_to_json(text)
-            logger.info(f"Converted JSON: {json.dumps(json_data, indent=2)}")
+            json_data = await self.text_to_json(text)
+        except Exception as e:
+            logger.error(f"Error adding to database: {str(e)}")
+            return {
+                "success": False,
+                "message": str(e),
+                "entity_data": None,
+                "db_result": None
+            }
+        return await self._store_entity(json_data)
+
+    async def add_to_db_batch(self, texts: List[str], bulk: bool = False) -> List[Dict[str, Any]]:
+        """Convert several texts concurrently and add them to HawkinsDB.
+
+        All conversions are issued at once (bounded by ``max_concurrent_requests``)
+        and each result is written as soon as its conversion completes, so
+        database writes overlap with the requests still in flight. Results are
+        returned in the same order as ``texts``. With ``bulk=True`` the
+        conversions go through the OpenAI Batch API instead, which is cheaper
+        but may take up to 24 hours to complete.
+        """
+        if not bulk:
+            return list(await asyncio.gather(*[self.add_to_db(text) for text in texts]))
+
+        try:
+            jsons = await self.text_to_json_batch(texts)
+        except Exception as e:
+            jsons = [e] * len(texts)
+
+        # Queue every conversion before awaiting so the storage worker can
+        # commit them together
+        stores = []
+        for json_data in jsons:
+            if isinstance(json_data, Exception):
+                logger.error(f"Error adding to database: {str(json_data)}")
+                stores.append(self._failed_store(json_data))
+            else:
+                stores.append(self._store_entity(json_data))
+        return list(await asyncio.gather(*stores))
+
+    @staticmethod
+    async def _failed_store(error: Exception) -> Dict[str, Any]:
+        return {
+            "success": False,
+            "message": str(error),
+            "entity_data": None,
+            "db_result": None
+        }
+
+    async def _store_entity(self, json_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Add converted JSON to HawkinsDB."""
+        try:
+            logger.debug("Converted JSON: %s", _LazyJSON(json_data))
+
+            result = await self._add_entity(json_data)
+            if not result.get("success"):
+                raise ValueError(result.get("message", "Failed to add entity"))
+            await self._clear_qa_cache()
 
-            result = self.db.add_entity(json_data)
             return {
                 "success": True,
                 "message": "Successfully added to database",
@@ -87,10 +953,28 @@ class TextToHawkinsDB:
                 "db_result": None
             }
 
-    def query_entity(self, entity_name: str) -> Dict[str, Any]:
+    # HawkinsDB calls block on SQLite; run them in worker threads so they
+    # don't stall the event loop while OpenAI requests are in flight.
+    async def _add_entity(self, json_data: Dict[str, Any]) -> Dict[str, Any]:
+        return await asyncio.wrap_future(self.storage_worker.submit(json_data))
+
+    async def _query_frames(self, entity_name: str) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.db.query_frames, entity_name)
+
+    async def _list_entities(self) -> List[str]:
+        return await asyncio.to_thread(self.db.list_entities)
+
+    async def _recent_frames(self, limit: int) -> List[Tuple[str, Dict[str, Any]]]:
+        return await asyncio.to_thread(self.db.recent_frames, limit)
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Wait until all queued database writes have been committed."""
+        self.storage_worker.flush(timeout)
+
+    async def query_entity(self, entity_name: str) -> Dict[str, Any]:
         """Query specific entity by name."""
         try:
-            frames = self.db.query_frames(entity_name)
+            frames = await self._query_frames(entity_name)
             if not frames:
                 return {
                     "success": False,
@@ -112,53 +996,126 @@ class TextToHawkinsDB:
                 "data": None
             }
 
-    def query_by_text(self, query_text: str) -> Dict[str, Any]:
-        """Query database using natural language text."""
+    async def _prepare_query(
+        self, query_text: str
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str], Optional[np.ndarray]]:
+        """Resolve a query from cache or build its prompt.
+
+        Returns ``(result, prompt, query_vector)``. ``result`` is set when the
+        query can be answered without the chat model (empty database or
+        cached answer); otherwise ``prompt`` holds the prompt to send.
+        """
+        # Only the most recent entities are used as context
+        recent = await self._recent_frames(5)
+        if not recent:
+            return {
+                "success": True,
+                "message": "Database is empty",
+                "response": "No information available in the database."
+            }, None, None
+
         try:
-            # Get all entities for context
-            entities = self.db.list_entities()
-            if not entities:
+            query_vector = await self._embed(query_text)
+        except Exception as e:
+            logger.warning(f"Error embedding query, skipping answer cache: {str(e)}")
+            query_vector = None
+
+        if query_vector is not None:
+            cached_answer = self._qa_cache_get(query_vector)
+            if cached_answer is not None:
                 return {
                     "success": True,
-                    "message": "Database is empty",
-                    "response": "No information available in the database."
-                }
-
-            # Build context from existing entities
-            context = []
-            for entity_name in entities[:5]:  # Limit to 5 most recent entities
-                frames = self.db.query_frames(entity_name)
-                if frames:
-                    context.append(json.dumps(frames, indent=2))
+                    "message": "Query answered from cache",
+                    "response": cached_answer
+                }, None, query_vector
 
-            # Create prompt with context
-            prompt = f"""You are a helpful assistant with access to a knowledge base.
-            Answer the following question based on this context:
+        # Compact JSON keeps the prompt (and its token count) small; entities
+        # that would exceed the byte budget are skipped so that one large
+        # entity does not crowd out the smaller ones after it
+        context = []
+        context_size = 0
+        for name, frames in recent:
+            part = _dumps(_frame_context(name, frames))
+            part_size = len(part.encode("utf-8"))
+            if context_size + part_size > CONTEXT_BUDGET:
+                logger.debug("Skipping %s in query context: %d bytes over budget", name, part_size)
+                continue
+            context.append(part)
+            context_size += part_size
 
-            Context:
-            {' '.join(context)}
+        # Loading the tokenizer may download it; do that once, off the event loop
+        await asyncio.to_thread(_qa_encoding)
 
-            Question: {query_text}
+        # Create prompt with context, dropping the oldest entities until it
+        # fits the model's window; an oversized request would only fail remotely
+        prompt_budget = QA_MODEL_MAX_TOKENS - QA_ANSWER_MAX_TOKENS
+        prompt = _build_qa_prompt(context, query_text)
+        while _count_tokens(prompt) > prompt_budget:
+            if not context:
+                raise ValueError("Query is too long for the model's context window")
+            context.pop()
+            prompt = _build_qa_prompt(context, query_text)
+        return None, prompt, query_vector
 
-            Rules:
-            1. Only use information from the provided context
-            2. If information is not in the context, say so
-            3. Be specific and include details when available
-            4. Format numbers and dates clearly
-            """
-
-            # Get response from GPT-4
-            response = self.client.chat.completions.create(
-                model="gpt4o",
+    async def _stream_answer(self, prompt: str) -> AsyncIterator[str]:
+        """Stream the chat model's answer to a prompt, chunk by chunk."""
+        async with self._sem:
+            # Only opening the stream is retried; a stream that fails midway
+            # has already yielded part of the answer
+            stream = await self._request(
+                self._qa_call,
                 messages=[
                     {"role": "system", "content": prompt}
                 ],
-                temperature=0.3,
-                max_tokens=500
+                stream=True
             )
+            # Closing releases the HTTP response even when the consumer stops
+            # early or is cancelled
+            try:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                await stream.close()
+
+    async def query_by_text_stream(self, query_text: str) -> AsyncIterator[str]:
+        """Query database using natural language text, yielding the answer as it arrives.
+
+        Cached answers and the empty-database message are yielded as a single
+        chunk. Errors are raised to the caller.
+        """
+        generation = self._qa_generation
+        result, prompt, query_vector = await self._prepare_query(query_text)
+        if result is not None:
+            yield result["response"]
+            return
+
+        parts = []
+        async for part in self._stream_answer(prompt):
+            parts.append(part)
+            yield part
+
+        answer = "".join(parts)
+        if query_vector is not None and answer:
+            await self._qa_cache_put(query_text, query_vector, answer, generation)
+
+    async def query_by_text(self, query_text: str) -> Dict[str, Any]:
+        """Query database using natural language text.
+
+        Answers are cached by question embedding, so near-duplicate questions
+        cost a single embeddings call until the database changes. Use
+        ``query_by_text_stream`` to receive the answer incrementally.
+        """
+        try:
+            generation = self._qa_generation
+            result, prompt, query_vector = await self._prepare_query(query_text)
+            if result is not None:
+                return result
+
+            answer = "".join([part async for part in self._stream_answer(prompt)])
+            if query_vector is not None and answer:
+                await self._qa_cache_put(query_text, query_vector, answer, generation)
 
-            answer = response.choices[0].message.content
-            
             return {
                 "success": True,
                 "message": "Query processed successfully",
@@ -173,10 +1130,10 @@ class TextToHawkinsDB:
                 "response": None
             }
 
-    def list_all_entities(self) -> Dict[str, Any]:
+    async def list_all_entities(self) -> Dict[str, Any]:
         """List all entities in the database."""
         try:
-            entities = self.db.list_entities()
+            entities = await self._list_entities()
             return {
                 "success": True,
                 "message": "Entities retrieved successfully",
@@ -190,10 +1147,13 @@ class TextToHawkinsDB:
                 "entities": None
             }
 
-def test_memory_examples():
-    """Test function to demonstrate usage."""
-    converter = TextToHawkinsDB()
-    
+async def run_memory_examples():
+    """Run the demonstration on a single event loop."""
+    async with TextToHawkinsDB() as converter:
+        await _run_memory_examples(converter)
+
+async def _run_memory_examples(converter: TextToHawkinsDB):
+    """Add the example texts and run the demonstration queries."""
     # Test adding entries
     examples = [
         """
@@ -213,23 +1173,25 @@ def test_memory_examples():
 
     # Add examples to database
     logger.info("\nAdding examples to database:")
-    for i, example in enumerate(examples, 1):
+    results = await converter.add_to_db_batch(examples)
+    for i, result in enumerate(results, 1):
         logger.info(f"\nAdding Example {i}")
         logger.info("=" * 50)
-        result = converter.add_to_db(example)
-        logger.info(f"Result: {json.dumps(result, indent=2)}")
+        logger.info("Result: %s", _LazyJSON(result))
 
     # Test queries
     logger.info("\nTesting queries:")
     
     # List all entities
     logger.info("\nListing all entities:")
-    entities_result = converter.list_all_entities()
-    logger.info(f"Entities: {json.dumps(entities_result, indent=2)}")
+    entities_result = await converter.list_all_entities()
+    logger.info("Entities: %s", _LazyJSON(entities_result))
 
     # Query specific entity
     logger.info("\nQuerying specific entity:")
-    entity_result = converter.query_entity("Python_Language")
+    # Look up the name the first example was stored under; the LLM picks it
+    python_entity = results[0]["entity_data"]["name"] if results[0]["success"] else "Python_Language"
+    entity_result = await converter.query_entity(python_entity)
     print(entity_result)
 
     # Test natural language queries
@@ -242,8 +1204,12 @@ def test_memory_examples():
     logger.info("\nTesting natural language queries:")
     for query in test_queries:
         logger.info(f"\nQuery: {query}")
-        result = converter.query_by_text(query)
-        logger.info(f"Response: {json.dumps(result, indent=2)}")
+        result = await converter.query_by_text(query)
+        logger.info("Response: %s", _LazyJSON(result))
+
+def test_memory_examples():
+    """Test function to demonstrate usage."""
+    asyncio.run(run_memory_examples())
 
 if __name__ == "__main__":
     test_memory_examples()
\ No newline at end of file
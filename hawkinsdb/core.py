@@ -72,11 +72,11 @@ class HawkinsDB:
     
     # Make EntityValidationError accessible via the class
     EntityValidationError = EntityValidationError
-    def __init__(self, storage=None, db_path=None, storage_type='sqlite'):
+    def __init__(self, storage=None, db_path=None, storage_type='sqlite', pragmas=None):
         if storage is None:
             if storage_type == 'sqlite':
                 db_path = db_path or "hawkins_memory.db"
-                self.storage = SQLiteStorage(db_path=db_path)
+                self.storage = SQLiteStorage(db_path=db_path, pragmas=pragmas)
             elif storage_type == 'json':
                 db_path = db_path or "hawkins_db.json"
                 self.storage = JSONStorage(path=db_path)
@@ -124,52 +124,9 @@ class HawkinsDB:
     def add_entity(self, data):
         """Add an entity with validation."""
         try:
-            if not isinstance(data, dict):
-                raise EntityValidationError("Entity data must be a dictionary")
-
-            memory_type = data.get("column", "Semantic")
-            name = data.get("name")
-            
-            if not name:
-                raise EntityValidationError("Entity name is required")
-
-            # Validate required fields based on memory type
-            if memory_type == "Episodic":
-                if "properties" not in data or "timestamp" not in data["properties"]:
-                    raise EntityValidationError("Episodic memories require a timestamp")
-                    
-            elif memory_type == "Procedural":
-                if "properties" not in data or "steps" not in data["properties"]:
-                    raise EntityValidationError("Procedural memories require steps")
-                
-            properties = data.get("properties", {})
-            relationships = data.get("relationships", {})
-            
-            frame = {
-                "name": name,
-                "properties": properties,
-                "relationships": relationships,
-                "location": data.get("location", {}),
-                "history": []
-            }
-            
-            if memory_type not in self.columns:
-                self.create_column(memory_type)
-                
-            column = self.columns[memory_type]
-            column["frames"].append(frame)
-            name = name.lower()
-            if name not in self.name_index:
-                self.name_index[name] = []
-            self.name_index[name].append((memory_type, frame))
-            
+            result = self._add_frame(data)
             self._save()
-            
-            return {
-                "success": True,
-                "entity_name": name,
-                "message": f"Successfully added {memory_type} memory: {name}"
-            }
+            return result
             
         except EntityValidationError as e:
             logger.error(f"Validation error: {str(e)}")
@@ -181,6 +138,84 @@ class HawkinsDB:
                 "message": str(e)
             }
 
+    def add_entities(self, entities):
+        """Add several entities and persist them with a single save.
+
+        Returns one result per entity, in order. Invalid entities are reported
+        as failed results instead of aborting the rest of the batch.
+        """
+        results = []
+        for data in entities:
+            try:
+                results.append(self._add_frame(data))
+            except Exception as e:
+                logger.error(f"Error adding entity: {str(e)}")
+                results.append({
+                    "success": False,
+                    "message": str(e)
+                })
+
+        if any(result["success"] for result in results):
+            try:
+                self._save()
+            except Exception as e:
+                logger.error(f"Error saving entities: {str(e)}")
+                results = [
+                    {"success": False, "message": str(e)} if result["success"] else result
+                    for result in results
+                ]
+        return results
+
+    def _add_frame(self, data):
+        """Validate entity data and add its frame to memory without saving."""
+        if not isinstance(data, dict):
+            raise EntityValidationError("Entity data must be a dictionary")
+
+        memory_type = data.get("column", "Semantic")
+        name = data.get("name")
+        
+        if not name:
+            raise EntityValidationError("Entity name is required")
+
+        # Validate required fields based on memory type
+        if memory_type == "Episodic":
+            if "properties" not in data or "timestamp" not in data["properties"]:
+                raise EntityValidationError("Episodic memories require a timestamp")
+                
+        elif memory_type == "Procedural":
+            if "properties" not in data or "steps" not in data["properties"]:
+                raise EntityValidationError("Procedural memories require steps")
+            
+        properties = data.get("properties", {})
+        relationships = data.get("relationships", {})
+        
+        now = datetime.now().isoformat()
+        frame = {
+            "name": name,
+            "properties": properties,
+            "relationships": relationships,
+            "location": data.get("location", {}),
+            "history": [],
+            "created_at": now,
+            "updated_at": now
+        }
+        
+        if memory_type not in self.columns:
+            self.create_column(memory_type)
+            
+        column = self.columns[memory_type]
+        column["frames"].append(frame)
+        name = name.lower()
+        if name not in self.name_index:
+            self.name_index[name] = []
+        self.name_index[name].append((memory_type, frame))
+        
+        return {
+            "success": True,
+            "entity_name": name,
+            "message": f"Successfully added {memory_type} memory: {name}"
+        }
+
     def query_frames(self, name):
         """Query frames by name and return dictionary of frames by column."""
         try:
@@ -205,3 +240,26 @@ class HawkinsDB:
             return sorted(list(self.name_index.keys()))
         except Exception:
             return []
+
+    def list_recent_entities(self, limit=5):
+        """List the names of the most recently added entities, newest first."""
+        try:
+            if hasattr(self.storage, "list_recent_entities"):
+                return self.storage.list_recent_entities(limit)
+            latest = {
+                name: max(frame.get("created_at", "") for _, frame in frames)
+                for name, frames in self.name_index.items()
+            }
+            return sorted(latest, key=latest.get, reverse=True)[:limit]
+        except Exception as e:
+            logger.error(f"Error listing recent entities: {str(e)}")
+            return []
+
+    def recent_frames(self, limit=5):
+        """Return (name, frames by column) for the most recent entities, newest first."""
+        result = []
+        for name in self.list_recent_entities(limit):
+            frames = self.query_frames(name)
+            if frames:
+                result.append((name, frames))
+        return result
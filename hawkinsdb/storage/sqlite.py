@@ -12,8 +12,26 @@ logger = logging.getLogger(__name__)
 class SQLiteStorage:
     """Simple SQLite storage implementation."""
     
-    def __init__(self, db_path: str = "hawkins_memory.db"):
-        """Initialize SQLite storage."""
+    # Per-connection pragmas; WAL journaling is persistent and set once at
+    # startup. The lock wait comes from sqlite3.connect's timeout, so
+    # busy_timeout is deliberately not set here.
+    DEFAULT_PRAGMAS = {
+        "synchronous": "NORMAL",
+    }
+    
+    def __init__(self, db_path: str = "hawkins_memory.db", pragmas: Optional[Dict[str, Any]] = None):
+        """Initialize SQLite storage.
+        
+        Args:
+            db_path: Path to the database file
+            pragmas: Extra PRAGMA settings applied to every connection,
+                e.g. {"temp_store": "MEMORY", "mmap_size": 268435456}
+        """
+        self.pragmas = {**self.DEFAULT_PRAGMAS, **(pragmas or {})}
+        for name, value in self.pragmas.items():
+            if not name.isidentifier() or not str(value).replace("-", "").isalnum():
+                raise ValueError(f"Invalid SQLite pragma: {name}={value}")
+        
         try:
             # Convert to absolute path
             self.db_path = str(Path(db_path).absolute())
@@ -39,8 +57,7 @@ class SQLiteStorage:
                 # Set pragmas for better performance and reliability
                 conn.execute("PRAGMA foreign_keys = ON")
                 conn.execute("PRAGMA journal_mode = WAL")
-                conn.execute("PRAGMA synchronous = NORMAL")
-                conn.execute("PRAGMA busy_timeout = 5000")
+                self._apply_pragmas(conn)
                 
                 # Initialize schema in a transaction
                 self.initialize()
@@ -84,11 +101,17 @@ class SQLiteStorage:
             conn.row_factory = sqlite3.Row
             # Enable foreign keys
             conn.execute("PRAGMA foreign_keys = ON")
+            self._apply_pragmas(conn)
             return conn
         except sqlite3.Error as e:
             logger.error(f"Failed to establish database connection: {e}")
             raise
 
+    def _apply_pragmas(self, conn: sqlite3.Connection) -> None:
+        """Apply the configured pragmas to a connection."""
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+
     def initialize(self):
         """Initialize database schema with proper error handling."""
         if not os.path.exists(self.db_path):
@@ -126,6 +149,7 @@ class SQLiteStorage:
                         
                         CREATE INDEX IF NOT EXISTS idx_frames_name ON frames(name);
                         CREATE INDEX IF NOT EXISTS idx_frames_column_id ON frames(column_id);
+                        CREATE INDEX IF NOT EXISTS idx_frames_created_at ON frames(created_at DESC);
                     ''')
                     
                     # Verify tables were created
@@ -230,14 +254,14 @@ class SQLiteStorage:
                     )
                     column_id = cursor.lastrowid
                     
-                    # Insert frames
-                    for frame in column.get('frames', []):
-                        cursor.execute('''
-                            INSERT INTO frames (
-                                name, column_id, properties, relationships, 
-                                location, history, created_at, updated_at
-                            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                        ''', (
+                    # Insert frames in one statement per column
+                    cursor.executemany('''
+                        INSERT INTO frames (
+                            name, column_id, properties, relationships, 
+                            location, history, created_at, updated_at
+                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', [
+                        (
                             frame['name'],
                             column_id,
                             json.dumps(frame.get('properties', {})),
@@ -246,7 +270,9 @@ class SQLiteStorage:
                             json.dumps(frame.get('history', [])),
                             frame.get('created_at', now),
                             frame.get('updated_at', now)
-                        ))
+                        )
+                        for frame in column.get('frames', [])
+                    ])
                         
             logger.info("Successfully saved %d columns", len(columns))
             
@@ -254,6 +280,31 @@ class SQLiteStorage:
             logger.error("Error saving columns: %s", str(e))
             raise
 
+    def list_recent_entities(self, limit: int = 5) -> List[str]:
+        """List the names of the most recently created frames, newest first."""
+        if not self._initialized:
+            raise RuntimeError("Storage not initialized")
+            
+        try:
+            names: List[str] = []
+            with self.get_connection() as conn:
+                # Rows are read lazily through the created_at index, so only
+                # the newest frames are visited
+                cursor = conn.execute(
+                    'SELECT name FROM frames ORDER BY created_at DESC, id DESC'
+                )
+                for row in cursor:
+                    name = row['name'].lower()
+                    if name not in names:
+                        names.append(name)
+                        if len(names) >= limit:
+                            break
+            return names
+            
+        except Exception as e:
+            logger.error("Error listing recent entities: %s", str(e))
+            raise
+
     def cleanup(self) -> None:
         """Clean up resources."""
         logger.info("SQLite storage cleaned up successfully")
@@ -46,14 +46,16 @@ setup(
             'requests-cache>=1.1.0'
         ],
         'llm': [
-            'openai>=1.0.0',
+            'openai>=1.40.0',
+            'numpy>=1.22.0',
             'tenacity>=8.2.0',
             'tiktoken>=0.5.0'
         ],
         'all': [
             'networkx>=3.0.0',
             'requests-cache>=1.1.0',
-            'openai>=1.0.0',
+            'openai>=1.40.0',
+            'numpy>=1.22.0',
             'tenacity>=8.2.0',
             'tiktoken>=0.5.0'
         ]
@@ -225,5 +225,55 @@ class TestHawkinsDBComprehensive:
         second_result = db.add_entity(duplicate)
         assert not second_result["success"], "Duplicate addition should fail"
 
+    def test_bulk_add(self, db):
+        """Test adding several entities with a single save."""
+        entities = [
+            {"name": "BulkEntity1", "column": "Semantic", "properties": {"index": 1}},
+            {"name": "BulkEntity2", "column": "Semantic", "properties": {"index": 2}},
+            {"name": "BulkEpisode", "column": "Episodic", "properties": {}},  # Missing timestamp
+            "not a dict"
+        ]
+        results = db.add_entities(entities)
+        assert len(results) == len(entities), "Expected one result per entity"
+        assert results[0]["success"] and results[1]["success"], "Valid entities should be added"
+        assert not results[2]["success"], "Episodic memory without timestamp should fail"
+        assert not results[3]["success"], "Non-dict entity should fail"
+
+        # Valid entities are persisted
+        reloaded = HawkinsDB(storage=db.storage)
+        assert "bulkentity1" in reloaded.list_entities()
+        assert "bulkentity2" in reloaded.list_entities()
+        assert "bulkepisode" not in reloaded.list_entities()
+
+    def test_list_recent_entities(self, db):
+        """Test listing the most recently added entities."""
+        for name in ["RecentFirst", "RecentSecond", "RecentThird"]:
+            result = db.add_entity({"name": name, "column": "Semantic"})
+            assert result["success"], f"Failed to add {name}: {result.get('message')}"
+
+        recent = db.list_recent_entities(limit=2)
+        assert recent == ["recentthird", "recentsecond"], f"Unexpected recent entities: {recent}"
+
+        recent_frames = db.recent_frames(limit=2)
+        assert [name for name, _ in recent_frames] == recent
+        assert "Semantic" in recent_frames[0][1], "Recent frames should be grouped by column"
+
+    def test_sqlite_pragmas(self, tmp_path):
+        """Test that SQLite pragmas are applied to every connection."""
+        db = HawkinsDB(db_path=str(tmp_path / "pragmas.db"), pragmas={"temp_store": "MEMORY"})
+        conn = db.storage.get_connection()
+        try:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+            assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+            # Default pragmas must not shorten the connect timeout
+            assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 60000
+        finally:
+            conn.close()
+            db.cleanup()
+
+        with pytest.raises(ValueError):
+            HawkinsDB(db_path=str(tmp_path / "invalid.db"), pragmas={"synchronous; DROP TABLE frames": "OFF"})
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v", "--log-cli-level=DEBUG"])
\ No newline at end of file
@@ -0,0 +1,540 @@
+"""Tests for the helpers in examples/HawkinDB_RAG.py."""
+import asyncio
+import json
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from types import SimpleNamespace
+
+import httpx
+import numpy as np
+import pytest
+import tenacity
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "examples"))
+import HawkinDB_RAG as rag  # noqa: E402
+
+
+class FakeDB:
+    """Records add_entities calls; optionally blocks or fails them."""
+
+    def __init__(self, fail: bool = False):
+        self.calls = []
+        self.fail = fail
+        self.release = threading.Event()
+        self.release.set()
+
+    def add_entities(self, entities):
+        self.release.wait()
+        self.calls.append(list(entities))
+        if self.fail:
+            raise RuntimeError("disk full")
+        return [{"success": True, "entity_name": e["name"]} for e in entities]
+
+
+class FakeStream:
+    """Stands in for the SDK's AsyncStream of chat completion chunks."""
+
+    def __init__(self, pieces):
+        self.pieces = pieces
+        self.closed = False
+
+    async def _chunks(self):
+        for piece in self.pieces:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+
+    def __aiter__(self):
+        return self._chunks()
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBatchAPI:
+    """Minimal Files and Batches endpoints; texts containing "fail" go to the error file."""
+
+    def __init__(self, content=None):
+        self.content = content or {
+            "column": "Semantic",
+            "name": "Widget",
+            "properties": [{"key": "color", "values": ["blue"]}],
+            "relationships": []
+        }
+        self.requests = []
+        self.files = SimpleNamespace(create=self.create_file, content=self.file_content)
+        self.batches = SimpleNamespace(create=self.create_batch)
+
+    async def create_file(self, file, purpose):
+        self.requests = [json.loads(line) for line in file[1].decode("utf-8").splitlines()]
+        return SimpleNamespace(id="file-input")
+
+    async def create_batch(self, **kwargs):
+        return SimpleNamespace(
+            id="batch-1", status="completed", output_file_id="file-output", error_file_id="file-error"
+        )
+
+    async def file_content(self, file_id):
+        lines = []
+        for request in self.requests:
+            failed = "fail" in request["body"]["messages"][-1]["content"]
+            if failed != (file_id == "file-error"):
+                continue
+            if failed:
+                response = {"status_code": 400, "body": {"error": {"message": "bad request"}}}
+            else:
+                message = {"content": json.dumps(self.content)}
+                response = {"status_code": 200, "body": {"choices": [{"message": message}]}}
+            lines.append(json.dumps({"custom_id": request["custom_id"], "response": response, "error": None}))
+        return SimpleNamespace(text="\n".join(lines))
+
+
+@pytest.fixture
+def converter(tmp_path, monkeypatch):
+    """TextToHawkinsDB with its database in a temporary directory; no requests are sent."""
+    monkeypatch.chdir(tmp_path)
+    converter = rag.TextToHawkinsDB(api_key="test")
+    yield converter
+    asyncio.run(converter.aclose())
+
+
+class TestStorageWorker:
+    """Test batching, flushing, stopping and cancellation in StorageWorker."""
+
+    @pytest.fixture
+    def db(self):
+        return FakeDB()
+
+    def test_batches_pending_writes(self, db):
+        worker = rag.StorageWorker(db)
+        futures = [worker.submit({"name": f"E{i}"}) for i in range(3)]
+        worker.start()
+        worker.flush(timeout=5)
+        assert db.calls == [[{"name": "E0"}, {"name": "E1"}, {"name": "E2"}]]
+        assert [f.result(0)["entity_name"] for f in futures] == ["E0", "E1", "E2"]
+        worker.stop()
+
+    def test_max_batch(self, db):
+        worker = rag.StorageWorker(db, max_batch=2)
+        for i in range(5):
+            worker.submit({"name": f"E{i}"})
+        worker.start()
+        worker.flush(timeout=5)
+        assert [len(call) for call in db.calls] == [2, 2, 1]
+        worker.stop()
+
+    def test_flush_waits_for_earlier_writes(self, db):
+        worker = rag.StorageWorker(db)
+        worker.start()
+        db.release.clear()
+        future = worker.submit({"name": "Slow"})
+        flushed = threading.Thread(target=worker.flush, args=(5,))
+        flushed.start()
+        flushed.join(0.1)
+        assert flushed.is_alive(), "flush returned before the pending write"
+        db.release.set()
+        flushed.join(5)
+        assert not flushed.is_alive()
+        assert future.done()
+        worker.stop()
+
+    def test_stop_writes_pending_entities(self, db):
+        worker = rag.StorageWorker(db)
+        future = worker.submit({"name": "Last"})
+        worker.start()
+        worker.stop()
+        assert not worker.is_alive()
+        assert future.result(0)["success"]
+
+    def test_cancelled_futures_are_skipped(self, db):
+        worker = rag.StorageWorker(db)
+        cancelled = worker.submit({"name": "Cancelled"})
+        kept = worker.submit({"name": "Kept"})
+        assert cancelled.cancel()
+        worker.start()
+        assert kept.result(5)["entity_name"] == "Kept"
+        assert db.calls == [[{"name": "Kept"}]]
+
+        # The worker survives and keeps serving writes and flushes
+        assert worker.submit({"name": "After"}).result(5)["success"]
+        worker.flush(timeout=5)
+        worker.stop()
+
+    def test_timed_out_caller_does_not_kill_worker(self, db):
+        worker = rag.StorageWorker(db)
+        worker.start()
+        db.release.clear()
+        running = worker.submit({"name": "Running"})
+        while not running.running():
+            time.sleep(0.01)
+
+        async def timed_out_add():
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(
+                    asyncio.wrap_future(worker.submit({"name": "TimedOut"})), 0.05
+                )
+            # A caller timing out while its write is already in progress
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(asyncio.wrap_future(running), 0.05)
+
+        asyncio.run(timed_out_add())
+        db.release.set()
+        assert running.result(5)["entity_name"] == "Running"
+        worker.flush(timeout=5)
+        assert worker.is_alive()
+        assert db.calls == [[{"name": "Running"}]]
+        worker.stop()
+
+    def test_claimed_future_resolved_elsewhere(self, db):
+        worker = rag.StorageWorker(db)
+        stray = Future()
+        stray.set_result("resolved elsewhere")
+        worker.write_queue.put(({"name": "Stray"}, stray))
+        worker.start()
+        assert worker.submit({"name": "Next"}).result(5)["success"]
+        assert db.calls == [[{"name": "Next"}]]
+        worker.stop()
+
+    def test_failed_write_sets_exception(self):
+        db = FakeDB(fail=True)
+        worker = rag.StorageWorker(db)
+        worker.start()
+        future = worker.submit({"name": "Broken"})
+        with pytest.raises(RuntimeError):
+            future.result(5)
+        worker.flush(timeout=5)
+        assert worker.is_alive()
+        worker.stop()
+
+
+def test_frame_context_is_compact(tmp_path):
+    """Prompt context keeps values and targets, not candidate metadata."""
+    db = rag.HawkinsDB(db_path=str(tmp_path / "context.db"))
+    db.add_entity({
+        "name": "Tesla_Model_3",
+        "column": "Semantic",
+        "properties": {"color": "red", "features": ["autopilot", "glass roof"]},
+        "relationships": {"located_in": ["garage"]}
+    })
+    [(name, frames)] = db.recent_frames(1)
+    assert rag._frame_context(name, frames) == {
+        "name": "Tesla_Model_3",
+        "Semantic": {
+            "properties": {"color": "red", "features": ["autopilot", "glass roof"]},
+            "relationships": {"located_in": "garage"}
+        }
+    }
+    db.cleanup()
+
+
+def test_stream_closed_when_consumer_stops_early(converter):
+    """Breaking out of a streamed answer closes the HTTP stream."""
+    stream = FakeStream(["an", "swer"])
+
+    async def qa_call(**kwargs):
+        return stream
+
+    converter._qa_call = qa_call
+
+    async def first_chunk():
+        answer = converter._stream_answer("prompt")
+        chunk = await answer.__anext__()
+        await answer.aclose()
+        return chunk
+
+    assert asyncio.run(first_chunk()) == "an"
+    assert stream.closed
+
+
+class TestFastExtract:
+    """Test the offline extraction path and its fallbacks to the LLM."""
+
+    def test_descriptive_text(self):
+        text = """
+        The Tesla Model 3 is red, made in 2023, and parked in the garage.
+        It has a range of 358 miles and goes 0-60 mph in 3.1 seconds.
+        """
+        assert rag._fast_extract(text) == {
+            "column": "Semantic",
+            "name": "Tesla_Model_3",
+            "properties": {
+                "color": ["red"],
+                "year": ["2023"],
+                "range": ["358 miles"],
+                "0_60_mph": ["3.1 seconds"]
+            },
+            "relationships": {"located_in": ["garage"]}
+        }
+
+    def test_creator_and_uses(self):
+        text = (
+            "Python is a programming language created by Guido van Rossum in 1991. "
+            "It is used for web development, data science, and automation."
+        )
+        result = rag._fast_extract(text)
+        assert result["properties"] == {"type": ["programming language"], "year": ["1991"]}
+        assert result["relationships"] == {
+            "created_by": ["Guido van Rossum"],
+            "used_for": ["web development", "data science", "automation"]
+        }
+
+    @pytest.mark.parametrize("text", [
+        # Negations would be stored as facts
+        "Alice is not a programming language created by Guido van Rossum in 1991.",
+        "The Foo Bar isn't blue, made in 2020, and kept in the shed.",
+        # Unmatched clauses would be dropped
+        "Python is a programming language created by Guido van Rossum in 1991. "
+        "It supports object-oriented, imperative, and functional programming.",
+        "The Foo Bar is blue, made in 2020, and kept in the shed. It is haunted.",
+        "Python is a programming language created by Guido van Rossum in 1991. "
+        "It is used for scripting but it is slow.",
+        # No named subject
+        "It is blue, made in 2020, and kept in the shed.",
+        "Today I completed my first Python project in my home office.",
+        # Too few fields
+        "The Foo Bar is blue.",
+        # Overlapping matches: the type phrase runs into the color
+        "The Foo Bar is a red car made in 2020 and kept in the shed.",
+        # Repeated keys would keep only the last value
+        "The Tesla Model 3 is a car with a range of 358 miles and a range of 400 miles, made in 2023.",
+    ])
+    def test_falls_back_to_llm(self, text):
+        assert rag._fast_extract(text) is None
+
+    @pytest.mark.parametrize("text, entity_type, location", [
+        ("The Eiffel Tower is a tower located in the city, built in 1889.", "tower", "city"),
+        ("The Ford Mustang is a car parked in the garage, made in 1965 and red.", "car", "garage"),
+    ])
+    def test_type_stops_before_location(self, text, entity_type, location):
+        result = rag._fast_extract(text)
+        assert result["properties"]["type"] == [entity_type]
+        assert result["relationships"]["located_in"] == [location]
+
+
+def test_answer_cache_appends_in_memory(converter):
+    """Cached answers are appended in memory and persisted for the next session."""
+    # More rows than the initial capacity, so the matrix has to grow
+    vectors = np.eye(20, dtype=np.float32)
+    queries = [f"question {i}" for i in range(20)]
+
+    async def fill():
+        await converter._qa_cache_put_many(queries, vectors, [f"answer {i}" for i in range(20)])
+        await converter._qa_cache_put("question 3", vectors[3], "updated", converter._qa_generation)
+
+    asyncio.run(fill())
+    assert len(converter._qa_answers) == 20, "Repeated questions should replace their row"
+    assert converter._qa_cache_get(vectors[19]) == "answer 19"
+    assert converter._qa_cache_get(vectors[3]) == "updated"
+
+    reopened = rag.TextToHawkinsDB(api_key="test")
+    try:
+        assert len(reopened._qa_answers) == 20
+        assert reopened._qa_cache_get(vectors[3]) == "updated"
+    finally:
+        asyncio.run(reopened.aclose())
+
+    asyncio.run(converter._clear_qa_cache())
+    assert converter._qa_cache_get(vectors[3]) is None
+
+
+def test_batch_submits_only_uncached_texts(converter):
+    """The Batch API only sees texts the fast path and cache cannot resolve."""
+    api = FakeBatchAPI()
+    converter.aclient = api
+    fast_text = "The Foo Bar is blue, made in 2020, and kept in the shed."
+    cached = {"column": "Semantic", "name": "Cached", "properties": {}, "relationships": {}}
+    texts = [fast_text, "A cached text.", "A new text.", "A new text.", "This one will fail."]
+
+    async def convert():
+        await converter._cache_put(converter._cache_key("A cached text."), cached)
+        results = await converter.text_to_json_batch(texts, poll_interval=0)
+        return results, await converter._cache_get(converter._cache_key("A new text."))
+
+    results, cached_after = asyncio.run(convert())
+    assert len(api.requests) == 2, "Only distinct uncached texts should be submitted"
+    assert results[0] == rag._fast_extract(fast_text)
+    assert results[1] == cached
+    assert results[2] == results[3] == cached_after
+    assert results[2]["properties"] == {"color": ["blue"]}
+    assert isinstance(results[4], ValueError)
+    assert "bad request" in str(results[4]), "The error file should be read"
+
+
+def test_oversized_entity_does_not_empty_context(converter):
+    """An entity over the context budget is skipped, not the ones after it."""
+    converter.db.add_entity({"name": "Small", "column": "Semantic", "properties": {"size": "small"}})
+    converter.db.add_entity({
+        "name": "Huge",
+        "column": "Semantic",
+        "properties": {"notes": "x" * (rag.CONTEXT_BUDGET + 1)}
+    })
+
+    async def embed(text):
+        return np.ones(3, dtype=np.float32) / np.sqrt(3)
+
+    converter._embed = embed
+    result, prompt, _ = asyncio.run(converter._prepare_query("How big is Small?"))
+    assert result is None
+    assert '"name":"Small"' in prompt
+    assert "Huge" not in prompt
+
+
+class TestEntity:
+    """Test the structured-output schema and its conversion for HawkinsDB."""
+
+    def test_to_dict_merges_and_keeps_lists(self):
+        entity = rag.Entity.model_validate_json(json.dumps({
+            "column": "Semantic",
+            "name": "Python",
+            "properties": [
+                {"key": "paradigm", "values": ["functional"]},
+                {"key": "year", "values": ["1991"]},
+                {"key": "paradigm", "values": ["imperative", "functional"]}
+            ],
+            "relationships": [
+                {"type": "created_by", "targets": ["Guido van Rossum"]},
+                {"type": "created_by", "targets": ["Guido van Rossum"]}
+            ]
+        }))
+        assert entity.to_dict() == {
+            "column": "Semantic",
+            "name": "Python",
+            "properties": {"paradigm": ["functional", "imperative"], "year": ["1991"]},
+            "relationships": {"created_by": ["Guido van Rossum"]}
+        }
+
+    @pytest.mark.parametrize("content", [
+        {"column": "Factual", "name": "X", "properties": [], "relationships": []},
+        {"column": "Semantic", "name": "X", "properties": {"a": "b"}, "relationships": []},
+        {"column": "Semantic", "name": "X", "properties": [], "relationships": [], "extra": 1},
+        {"column": "Semantic", "properties": [], "relationships": []},
+    ])
+    def test_invalid_batch_response(self, converter, content):
+        converter.aclient = FakeBatchAPI(content=content)
+        [result] = asyncio.run(converter.text_to_json_batch(["Some text."], poll_interval=0))
+        assert isinstance(result, ValueError)
+        assert "Invalid batch response" in str(result)
+
+
+def test_prompt_trimmed_to_model_window(converter, monkeypatch):
+    """The oldest context entries are dropped until the prompt fits."""
+    threads = []
+
+    def no_encoding():
+        threads.append(threading.current_thread())
+        return None  # token counts are estimated from the byte length
+
+    monkeypatch.setattr(rag, "_qa_encoding", no_encoding)
+    for name in ["Oldest", "Middle", "Newest"]:
+        converter.db.add_entity({"name": name, "column": "Semantic", "properties": {"rank": name}})
+
+    async def embed(text):
+        return np.ones(3, dtype=np.float32) / np.sqrt(3)
+
+    converter._embed = embed
+    query = "Which entities exist?"
+    [newest, middle, _] = [
+        rag._dumps(rag._frame_context(name, frames)) for name, frames in converter.db.recent_frames(5)
+    ]
+
+    # Room for the two newest entities only
+    fits = rag._count_tokens(rag._build_qa_prompt([newest, middle], query))
+    monkeypatch.setattr(rag, "QA_MODEL_MAX_TOKENS", rag.QA_ANSWER_MAX_TOKENS + fits)
+    threads.clear()
+    _, prompt, _ = asyncio.run(converter._prepare_query(query))
+    assert "Newest" in prompt and "Middle" in prompt
+    assert "Oldest" not in prompt
+    assert threads[0] is not threading.main_thread(), "The tokenizer should load off the event loop"
+
+    # Not even the question fits
+    empty = rag._count_tokens(rag._build_qa_prompt([], query))
+    monkeypatch.setattr(rag, "QA_MODEL_MAX_TOKENS", rag.QA_ANSWER_MAX_TOKENS + empty - 1)
+    with pytest.raises(ValueError):
+        asyncio.run(converter._prepare_query(query))
+
+
+def test_answer_not_cached_after_concurrent_write(converter):
+    """An answer built from context older than the latest write is not cached."""
+    converter.db.add_entity({"name": "Before", "column": "Semantic", "properties": {"state": "old"}})
+
+    async def embed(text):
+        return np.ones(3, dtype=np.float32) / np.sqrt(3)
+
+    class WriteMidStream(FakeStream):
+        async def _chunks(self):
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="stale "))])
+            # Another task stores an entity while the answer is streaming
+            await converter._clear_qa_cache()
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="answer"))])
+
+    async def qa_call(**kwargs):
+        return WriteMidStream([])
+
+    converter._embed = embed
+    converter._qa_call = qa_call
+
+    async def ask():
+        result = await converter.query_by_text("What state is Before in?")
+        streamed = "".join([part async for part in converter.query_by_text_stream("Before?")])
+        return result, streamed
+
+    result, streamed = asyncio.run(ask())
+    assert result["response"] == streamed == "stale answer"
+    assert converter._qa_answers == [], "Stale answers must not be cached"
+
+
+def rate_limit_error():
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    return rag.RateLimitError("slow down", response=httpx.Response(429, request=request), body=None)
+
+
+class TestRequestRetry:
+    """Test the retry layer every OpenAI call goes through."""
+
+    @pytest.fixture(autouse=True)
+    def no_wait(self, monkeypatch):
+        monkeypatch.setattr(rag.TextToHawkinsDB._request.retry, "wait", tenacity.wait_none())
+
+    def test_retries_rate_limits(self, converter):
+        calls = []
+
+        async def endpoint(**kwargs):
+            calls.append(kwargs)
+            if len(calls) == 1:
+                raise rate_limit_error()
+            return "ok"
+
+        assert asyncio.run(converter._request(endpoint, model="gpt-4o")) == "ok"
+        assert calls == [{"model": "gpt-4o"}] * 2
+
+    def test_gives_up_after_five_attempts(self, converter):
+        calls = []
+
+        async def endpoint(**kwargs):
+            calls.append(kwargs)
+            raise rate_limit_error()
+
+        with pytest.raises(rag.RateLimitError):
+            asyncio.run(converter._request(endpoint))
+        assert len(calls) == 5
+
+    def test_other_errors_fail_immediately(self, converter):
+        calls = []
+
+        async def endpoint(**kwargs):
+            calls.append(kwargs)
+            raise ValueError("bad request")
+
+        with pytest.raises(ValueError):
+            asyncio.run(converter._request(endpoint))
+        assert len(calls) == 1
+
+    def test_endpoint_keyword_is_passed_through(self, converter):
+        async def create_batch(**kwargs):
+            return kwargs
+
+        result = asyncio.run(converter._request(
+            create_batch, input_file_id="file-input", endpoint="/v1/chat/completions"
+        ))
+        assert result == {"input_file_id": "file-input", "endpoint": "/v1/chat/completions"}